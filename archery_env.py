@@ -3,68 +3,195 @@ from gymnasium import spaces
 import numpy as np
 import pygame
 import math
+import threading
+import _thread
+from numba import njit
+
+# Rule for the per-step code: scalar ops -> math, array ops -> np.
+# np.sin / np.interp / np scalar arithmetic on single values pay ufunc dispatch
+# and boxing on every call; plain floats and the math module don't.
+
+# Field and physics, shared with BatchedArcheryEnv
+WIDTH = 800
+HEIGHT = 600
+GRAVITY = 0.5
+TARGET_RADIUS = 20
+START_POS = (50.0, HEIGHT - 50.0) # Fixed start point
+
+# Action scaling constants (affine maps from [-1, 1])
+ANGLE_SLOPE = math.radians(85) / 2            # 0 to 85 degrees
+POWER_SLOPE = (60 - 15) / 2                   # STRONG: 15 to 60 | WEAK: 10 to 30
+POWER_OFFSET = 15.0
+
+
+# Spaces are built per env (a Box carries its own sampling RNG), but defined once here
+def make_action_space():
+    # Action Space: [-1, 1]
+    return spaces.Box(
+        low=np.array([-1, -1]), 
+        high=np.array([1, 1]), 
+        dtype=np.float32
+    )
+
+
+def make_observation_space():
+    # Observation Space: -Inf to Inf
+    return spaces.Box(
+        low=-np.inf, 
+        high=np.inf, 
+        shape=(4,), 
+        dtype=np.float32
+    )
+
+
+# Hard ceiling on flight length. Sweeping the whole action range (0 to 85
+# degrees, power 15 to 60) the longest flight is 104 frames, at about 73.9
+# degrees and power 26.1; steeper or stronger shots leave through the y < -100
+# ceiling first. 256 leaves headroom.
+MAX_FLIGHT_STEPS = 256
+
+# Target positions are drawn this many at a time
+TARGET_BATCH = 1024
+
+
+@njit(cache=True)
+def simulate_flight(x0, y0, vx, vy, g, tx, ty, r2, w, h):
+    """Step one shot frame by frame. r2 is the squared hit radius. Returns (positions, n_frames, hit)."""
+    trajectory = np.empty((MAX_FLIGHT_STEPS, 2))
+    x, y = x0, y0
+    n = 0
+    for _ in range(MAX_FLIGHT_STEPS):
+        x += vx
+        y += vy
+        vy += g
+        trajectory[n, 0] = x
+        trajectory[n, 1] = y
+        n += 1
+
+        dx = x - tx
+        dy = y - ty
+        if dx * dx + dy * dy < r2:
+            return trajectory, n, True
+
+        if x > w or x < 0 or y > h or y < -100:
+            break
+
+    return trajectory, n, False
+
+
+def _cubic_real_roots(a, b, c, d):
+    """Real roots of a*t^3 + b*t^2 + c*t + d (a != 0), by Cardano's formula."""
+    # Depressed cubic u^3 + p*u + q with t = u - b / (3a)
+    shift = b / (3 * a)
+    p = (3 * a * c - b * b) / (3 * a * a)
+    q = (2 * b ** 3 - 9 * a * b * c + 27 * a * a * d) / (27 * a ** 3)
+    disc = (q / 2) ** 2 + (p / 3) ** 3
+
+    if disc > 0:
+        # One real root
+        sq = math.sqrt(disc)
+        u = -q / 2 + sq
+        v = -q / 2 - sq
+        return (math.copysign(abs(u) ** (1 / 3), u) + math.copysign(abs(v) ** (1 / 3), v) - shift,)
+
+    # Three real roots (trigonometric form)
+    m = 2 * math.sqrt(max(-p / 3, 0.0))
+    denom = math.sqrt(max(-(p / 3) ** 3, 1e-300))
+    theta = math.acos(min(max(-q / 2 / denom, -1.0), 1.0)) / 3
+    return tuple(m * math.cos(theta - 2 * math.pi * k / 3) - shift for k in range(3))
+
 
 class ArcheryGymEnv(gym.Env):
     metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 60}
 
-    def __init__(self, render_mode=None):
+    def __init__(self, render_mode=None, minimal_render=False):
         super(ArcheryGymEnv, self).__init__()
         
-        self.width = 800
-        self.height = 600
+        self.width = WIDTH
+        self.height = HEIGHT
         self.render_mode = render_mode
+        self.visual = render_mode == "human"
+        self.minimal_render = minimal_render # rgb_array: skip archer and accuracy overlay
         self.screen = None
         self.clock = None
         self.font = None
         self.accuracy_label = "N/A"
 
-        self.gravity = 0.5
-        self.target_radius = 20
+        # Rendering runs on its own thread; step() only publishes snapshots,
+        # waiting (via _snapshot_taken) until the previous one has been picked up
+        self._render_thread = None
+        self._render_stop = threading.Event()
+        self._snapshot = None
+        self._snapshot_taken = threading.Event()
+        self._snapshot_taken.set()
+        self._render_error = None # Raised from the render thread, re-raised to the caller
+
+        # Pre-rendered background (fill, watermark, target) and last frame's dirty rects
+        self._bg_surface = None
+        self._bg_key = None
+        self._bg_rects = []
+        self._prev_rects = []
+        self._accuracy_surface = None
+        self._accuracy_label_cached = None
+
+        self.gravity = GRAVITY
+        self.target_radius = TARGET_RADIUS
+        # Hit checks compare squared distances; no sqrt per frame
+        self._hit_radius_sq = (self.target_radius + 10) * (self.target_radius + 10)
         
         # --- NEW: Store the launch angle for visualization ---
         self.launch_angle_rad = 0.0 
-        self.start_pos = np.array([50.0, self.height - 50.0]) # Fixed start point
+        self.start_pos = np.array(START_POS)
+        self._start_pos_int = (int(self.start_pos[0]), int(self.start_pos[1]))
         # -----------------------------------------------------
 
-        # Action Space: [-1, 1]
-        self.action_space = spaces.Box(
-            low=np.array([-1, -1]), 
-            high=np.array([1, 1]), 
-            dtype=np.float32
-        )
+        # Observation buffers, reused across calls. step() and reset() fill
+        # separate ones: VecEnvs such as DummyVecEnv keep step()'s obs as
+        # terminal_observation and then call reset() before copying it
+        self._step_obs_buf = np.empty(4, dtype=np.float32)
+        self._reset_obs_buf = np.empty(4, dtype=np.float32)
+        self._inv_w = 1.0 / self.width
+        self._inv_h = 1.0 / self.height
 
-        # Observation Space: -Inf to Inf
-        self.observation_space = spaces.Box(
-            low=-np.inf, 
-            high=np.inf, 
-            shape=(4,), 
-            dtype=np.float32
-        )
+        # Target buffers start exhausted so the first reset() fills them
+        self._target_idx = TARGET_BATCH
+
+        self.action_space = make_action_space()
+        self.observation_space = make_observation_space()
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
+        # A new seed must also discard targets drawn from the old generator
+        if seed is not None or self._target_idx >= TARGET_BATCH:
+            self._tx_buf = self.np_random.integers(300, self.width - 50, size=TARGET_BATCH)
+            self._ty_buf = self.np_random.integers(50, self.height - 200, size=TARGET_BATCH)
+            self._target_idx = 0
         self.target_pos = np.array([
-            self.np_random.integers(300, self.width - 50),
-            self.np_random.integers(50, self.height - 200)
+            self._tx_buf[self._target_idx],
+            self._ty_buf[self._target_idx]
         ], dtype=np.float32)
+        self._target_idx += 1
+        # The target doesn't move during an episode; keep pixel coords for drawing
+        self._target_pos_int = (int(self.target_pos[0]), int(self.target_pos[1]))
         
         # Reset Arrow to start position
         self.arrow_pos = self.start_pos.copy()
         self.arrow_vel = np.array([0.0, 0.0], dtype=np.float32)
 
         if self.render_mode == "human":
-            self._render_frame()
+            self._publish_snapshot(self.arrow_pos[None, :].copy())
+            if self._render_thread is None:
+                self._render_thread = threading.Thread(target=self._render_loop, daemon=True)
+                self._render_thread.start()
 
-        return self._get_obs(), {}
+        return self._get_obs(self._reset_obs_buf), {}
 
     def step(self, action):
-        # Action Scaling
-        raw_angle = action[0]
-        angle_deg = np.interp(raw_angle, [-1, 1], [0, 85])
-        raw_power = action[1]
-        power_val = np.interp(raw_power, [-1, 1], [15, 60]) # STRONG: 15 to 60 | WEAK: 10 to 30
-
-        rad_angle = math.radians(angle_deg)
+        # Action Scaling: [-1, 1] -> angle 0 to 85 deg (in rad), power 15 to 60
+        raw_angle = min(max(float(action[0]), -1.0), 1.0)
+        raw_power = min(max(float(action[1]), -1.0), 1.0)
+        rad_angle = (raw_angle + 1.0) * ANGLE_SLOPE
+        power_val = (raw_power + 1.0) * POWER_SLOPE + POWER_OFFSET
         
         # --- SAVE ANGLE FOR RENDERER ---
         self.launch_angle_rad = rad_angle
@@ -73,47 +200,120 @@ class ArcheryGymEnv(gym.Env):
         self.arrow_vel[0] = math.cos(rad_angle) * power_val
         self.arrow_vel[1] = -math.sin(rad_angle) * power_val
 
-        terminated = False
-        hit_target = False
-        
-        while True:
-            self.arrow_pos += self.arrow_vel
-            self.arrow_vel[1] += self.gravity 
-
-            if self.render_mode == "human":
-                self._render_frame()
-
-            dist = math.hypot(self.arrow_pos[0] - self.target_pos[0], self.arrow_pos[1] - self.target_pos[1])
-
-            if dist < self.target_radius + 10:
-                hit_target = True
-                terminated = True
-                break
-            
-            if (self.arrow_pos[0] > self.width or 
-                self.arrow_pos[0] < 0 or 
-                self.arrow_pos[1] > self.height or 
-                self.arrow_pos[1] < -100):
-                terminated = True
-                break
+        terminated = True
+
+        # Training doesn't need the per-frame positions, so solve the flight
+        # analytically; only the viewer steps through it frame by frame.
+        if self.render_mode == "human":
+            hit_target, dist = self._simulate_flight()
+        else:
+            hit_target, dist = self._solve_flight()
 
         if hit_target:
             reward = 100.0
         else:
             reward = -1.0 * (dist / 100.0)
 
-        return self._get_obs(), reward, terminated, False, {}
+        return self._get_obs(self._step_obs_buf), reward, terminated, False, {}
 
-    def _get_obs(self):
-        return np.array([
-            self.arrow_pos[0] / self.width,
-            self.arrow_pos[1] / self.height,
-            self.target_pos[0] / self.width,
-            self.target_pos[1] / self.height
-        ], dtype=np.float32)
+    def _simulate_flight(self):
+        # Physics runs compiled; the render thread plays the frames back
+        trajectory, n_frames, hit = simulate_flight(
+            float(self.arrow_pos[0]), float(self.arrow_pos[1]),
+            float(self.arrow_vel[0]), float(self.arrow_vel[1]), self.gravity,
+            float(self.target_pos[0]), float(self.target_pos[1]), self._hit_radius_sq,
+            self.width, self.height
+        )
 
-    def _render_frame(self):
-        if self.screen is None:
+        x, y = float(trajectory[n_frames - 1, 0]), float(trajectory[n_frames - 1, 1])
+        self.arrow_pos[:] = (x, y)
+        self._publish_snapshot(trajectory[:n_frames])
+
+        dist = math.hypot(x - float(self.target_pos[0]), y - float(self.target_pos[1]))
+        return hit, dist
+
+    def _solve_flight(self):
+        # The frame loop moves the arrow first and applies gravity after, so
+        # frame n sits exactly on x0 + vx*n, y0 + b*n + a*n^2 with these a, b.
+        # Only whole frames count, exactly as in the loop.
+        x0, y0 = float(self.arrow_pos[0]), float(self.arrow_pos[1])
+        vx, vy = float(self.arrow_vel[0]), float(self.arrow_vel[1])
+        tx, ty = float(self.target_pos[0]), float(self.target_pos[1])
+        a = 0.5 * self.gravity
+        b = vy - a
+        r2 = self._hit_radius_sq
+
+        def position_at(n):
+            return x0 + vx * n, y0 + b * n + a * n * n
+
+        def dist_sq(n):
+            x, y = position_at(n)
+            return (x - tx) * (x - tx) + (y - ty) * (y - ty)
+
+        # --- First frame outside the field: the loop's last frame ---
+        n_end = MAX_FLIGHT_STEPS
+        if vx > 0:
+            n_end = min(n_end, math.floor((self.width - x0) / vx) + 1)
+        # Ground: the arrow starts above it, so there is exactly one positive root
+        c = y0 - self.height
+        n_end = min(n_end, math.floor((-b + math.sqrt(b * b - 4 * a * c)) / (2 * a)) + 1)
+        # Ceiling: y < -100 strictly between the two roots, only on the way up
+        c = y0 + 100
+        disc = b * b - 4 * a * c
+        if b < 0 and disc > 0:
+            sq = math.sqrt(disc)
+            n = math.floor((-b - sq) / (2 * a)) + 1
+            if n < (-b + sq) / (2 * a):
+                n_end = min(n_end, n)
+
+        # --- Closest frames to the target ---
+        # d/dt of the squared distance is a cubic in t. Between its roots the
+        # distance is monotone, so every run of frames inside the hit radius
+        # has its closest frame at 1, n_end, or next to a root.
+        px, py = x0 - tx, y0 - ty
+        candidates = {1, n_end}
+        for t in _cubic_real_roots(2 * a * a, 3 * a * b, vx * vx + b * b + 2 * a * py, px * vx + py * b):
+            if 0 < t < n_end:
+                candidates.add(max(math.floor(t), 1))
+                candidates.add(min(math.floor(t) + 1, n_end))
+
+        for n in sorted(candidates):
+            if dist_sq(n) < r2:
+                # The loop stops at the first frame of this run
+                while n > 1 and dist_sq(n - 1) < r2:
+                    n -= 1
+                self.arrow_pos[:] = position_at(n)
+                return True, math.sqrt(dist_sq(n))
+
+        x, y = position_at(n_end)
+        self.arrow_pos[:] = (x, y)
+        return False, math.hypot(x - tx, y - ty)
+
+    def _get_obs(self, obs_buf):
+        # Filled in place: the returned array is overwritten by the next
+        # call of the same kind, so callers that keep it must copy it
+        obs_buf[0] = float(self.arrow_pos[0]) * self._inv_w
+        obs_buf[1] = float(self.arrow_pos[1]) * self._inv_h
+        obs_buf[2] = float(self.target_pos[0]) * self._inv_w
+        obs_buf[3] = float(self.target_pos[1]) * self._inv_h
+        return obs_buf
+
+    def _publish_snapshot(self, trajectory):
+        # Single slot with a bounded handoff: at most one flight waits behind the
+        # one on screen, so the caller runs at display speed and stays in step
+        # with what is drawn. A tuple store is atomic under the GIL.
+        if self._render_thread is not None:
+            while not self._snapshot_taken.wait(0.1):
+                if self._render_stop.is_set():
+                    break
+        # A dead render thread (e.g. no usable display) must fail loudly, not stall
+        if self._render_error is not None:
+            raise self._render_error
+        self._snapshot_taken.clear()
+        self._snapshot = (trajectory, self._target_pos_int, self.launch_angle_rad, self.accuracy_label)
+
+    def _render_loop(self):
+        try:
             pygame.init()
             pygame.font.init()
             self.screen = pygame.display.set_mode((self.width, self.height))
@@ -121,46 +321,157 @@ class ArcheryGymEnv(gym.Env):
             self.clock = pygame.time.Clock()
             self.font = pygame.font.SysFont("Arial", 120, bold=True)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.close()
-                raise KeyboardInterrupt 
+            shown = None
+            frame = 0
+            ticks = 0
+            while not self._render_stop.is_set():
+                # Keep the window responsive every frame, but only walk the
+                # event queue looking for QUIT every 16th
+                ticks += 1
+                if ticks & 15 == 0:
+                    for event in pygame.event.get():
+                        if event.type == pygame.QUIT:
+                            self._render_stop.set()
+                            _thread.interrupt_main()
+                else:
+                    pygame.event.pump()
 
-        self.screen.fill((30, 30, 30))
-        
-        # --- DRAW ARCHER (The visualization you asked for) ---
-        # We draw a line from the start position pointing in the direction of the launch angle
-        # Length of the "Bow" line
-        bow_length = 50 
+                # Finish playing the current flight before picking up the latest one
+                if shown is None or (frame >= len(shown[0]) and self._snapshot is not shown):
+                    shown = self._snapshot
+                    frame = 0
+                    if shown is not None:
+                        self._snapshot_taken.set()
+
+                if shown is not None:
+                    trajectory, target_pos_int, launch_angle_rad, accuracy_label = shown
+                    arrow_pos = trajectory[min(frame, len(trajectory) - 1)]
+                    frame += 1
+                    self._render_frame(arrow_pos, target_pos_int, launch_angle_rad, accuracy_label)
+
+                self.clock.tick(self.metadata["render_fps"])
+        except Exception as e:
+            # Hand the error to the main thread; _publish_snapshot re-raises it
+            self._render_error = e
+        finally:
+            # Never leave the main thread waiting on a dead renderer
+            self._render_stop.set()
+            self._snapshot_taken.set()
+            pygame.quit()
+
+    def render(self):
+        if self.render_mode != "rgb_array":
+            return None
+
+        # Offscreen surface, no window
+        if self.screen is None:
+            pygame.init()
+            self.screen = pygame.Surface((self.width, self.height))
+            if not self.minimal_render:
+                pygame.font.init()
+                self.font = pygame.font.SysFont("Arial", 120, bold=True)
+
+        self._render_frame(self.arrow_pos, self._target_pos_int, self.launch_angle_rad, self.accuracy_label)
+        return np.transpose(np.array(pygame.surfarray.pixels3d(self.screen)), axes=(1, 0, 2))
+
+    def _render_frame(self, arrow_pos, target_pos_int, launch_angle_rad, accuracy_label):
+        # Nothing to draw on (e.g. training with render_mode=None)
+        if self.screen is None and self.render_mode != "human":
+            return
+
+        # Rebuild the background only when the target or the label changes,
+        # otherwise just erase last frame's arrow and bow with it
+        bg_key = (target_pos_int, accuracy_label)
+        dirty = self._prev_rects
+        if self._bg_surface is None or bg_key != self._bg_key:
+            dirty = dirty + self._update_background(target_pos_int, accuracy_label)
+            self._bg_key = bg_key
+        for rect in dirty:
+            self.screen.blit(self._bg_surface, rect, rect)
+
+        new_rects = []
+        if not self.minimal_render:
+            # --- DRAW ARCHER (The visualization you asked for) ---
+            # We draw a line from the start position pointing in the direction of the launch angle
+            # Length of the "Bow" line
+            bow_length = 50 
         
-        # Calculate end point of the bow line
-        end_x = self.start_pos[0] + math.cos(self.launch_angle_rad) * bow_length
-        end_y = self.start_pos[1] - math.sin(self.launch_angle_rad) * bow_length # Minus because Y is flipped in Pygame
+            # Calculate end point of the bow line
+            end_x = self.start_pos[0] + math.cos(launch_angle_rad) * bow_length
+            end_y = self.start_pos[1] - math.sin(launch_angle_rad) * bow_length # Minus because Y is flipped in Pygame
 
-        # Draw the "Arm/Bow" (Cyan Line)
-        pygame.draw.line(self.screen, (0, 255, 255), self.start_pos, (end_x, end_y), 4)
+            # Draw the "Arm/Bow" (Cyan Line)
+            new_rects.append(pygame.draw.line(self.screen, (0, 255, 255), self.start_pos, (end_x, end_y), 4))
         
-        # Draw a base pivot point (White dot)
-        pygame.draw.circle(self.screen, (255, 255, 255), self.start_pos.astype(int), 5)
-        # -----------------------------------------------------
+            # Draw a base pivot point (White dot)
+            new_rects.append(pygame.draw.circle(self.screen, (255, 255, 255), self._start_pos_int, 5))
+            # -----------------------------------------------------
+
+        # Draw Arrow
+        new_rects.append(pygame.draw.circle(self.screen, (50, 255, 50), (int(arrow_pos[0]), int(arrow_pos[1])), 5))
+
+        self._prev_rects = new_rects
+        if self.visual:
+            pygame.display.update(dirty + new_rects)
+
+    def _update_background(self, target_pos_int, accuracy_label):
+        """Redraw the watermark and target into the background; returns the rects that changed."""
+        bg = self._bg_surface
+        if bg is None:
+            bg = pygame.Surface((self.width, self.height))
+            if self.visual:
+                # Match the display's pixel format so blits don't convert per pixel
+                bg = bg.convert()
+            self._bg_surface = bg
+            bg.fill((30, 30, 30))
+            stale = [bg.get_rect()]
+        else:
+            # Wipe only what the last update drew, not the whole canvas
+            stale = self._bg_rects
+            for rect in stale:
+                bg.fill((30, 30, 30), rect)
+
+        drawn = []
 
         # Draw Accuracy Watermark
-        if self.font:
-            text_surf = self.font.render(self.accuracy_label, True, (255, 255, 255))
-            text_surf.set_alpha(40) 
-            text_rect = text_surf.get_rect(center=(self.width // 2, self.height // 2))
-            self.screen.blit(text_surf, text_rect)
+        if self.font and not self.minimal_render:
+            # The label only changes between shots, so keep its rasterized surface
+            if accuracy_label != self._accuracy_label_cached:
+                self._accuracy_surface = self.font.render(accuracy_label, True, (255, 255, 255))
+                if self.visual:
+                    self._accuracy_surface = self._accuracy_surface.convert_alpha()
+                self._accuracy_surface.set_alpha(40) 
+                self._accuracy_label_cached = accuracy_label
+            text_rect = self._accuracy_surface.get_rect(center=(self.width // 2, self.height // 2))
+            drawn.append(bg.blit(self._accuracy_surface, text_rect))
 
         # Draw Target
-        pygame.draw.circle(self.screen, (255, 50, 50), self.target_pos.astype(int), self.target_radius)
-        pygame.draw.circle(self.screen, (255, 255, 255), self.target_pos.astype(int), self.target_radius - 10)
-        
-        # Draw Arrow
-        pygame.draw.circle(self.screen, (50, 255, 50), self.arrow_pos.astype(int), 5)
-        
-        pygame.display.flip()
-        self.clock.tick(self.metadata["render_fps"])
+        drawn.append(pygame.draw.circle(bg, (255, 50, 50), target_pos_int, self.target_radius))
+        pygame.draw.circle(bg, (255, 255, 255), target_pos_int, self.target_radius - 10)
+
+        self._bg_rects = drawn
+        return stale + drawn
 
     def close(self):
-        if self.screen is not None:
-            pygame.quit()
\ No newline at end of file
+        if self._render_thread is not None:
+            # The render thread owns pygame and quits it on the way out
+            self._render_stop.set()
+            self._render_thread.join()
+            self._render_thread = None
+            self._render_stop.clear()
+            self._render_error = None
+            self._snapshot = None
+            self._snapshot_taken.set()
+        elif self.screen is not None:
+            pygame.quit()
+
+        # Surfaces die with pygame; start from scratch if rendering again
+        self.screen = None
+        self.clock = None
+        self.font = None
+        self._bg_surface = None
+        self._bg_key = None
+        self._bg_rects = []
+        self._prev_rects = []
+        self._accuracy_surface = None
+        self._accuracy_label_cached = None
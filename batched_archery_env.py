@@ -0,0 +1,221 @@
+from copy import deepcopy
+
+import numpy as np
+from gymnasium.utils import seeding
+from stable_baselines3.common.vec_env import DummyVecEnv, VecEnv
+
+from archery_env import (
+    ANGLE_SLOPE, GRAVITY, HEIGHT, MAX_FLIGHT_STEPS, POWER_OFFSET, POWER_SLOPE,
+    START_POS, TARGET_RADIUS, WIDTH, make_action_space, make_observation_space
+)
+
+
+class BatchedArcheryEnv(VecEnv):
+    """
+    N copies of ArcheryGymEnv simulated together in one process.
+
+    Every shot ends its episode, so each step solves all N flights at once
+    with NumPy (the same whole-frame solve as ArcheryGymEnv._solve_flight) and
+    resets every env. Plugs straight into SB3 in place of make_vec_env.
+    """
+
+    def __init__(self, num_envs):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.gravity = GRAVITY
+        self.target_radius = TARGET_RADIUS
+        self.render_mode = None
+
+        self.np_random, _ = seeding.np_random()
+
+        # Batched state, one row per env
+        self.start_pos = np.array(START_POS)
+        self.arrow_pos = np.tile(self.start_pos, (num_envs, 1))
+        self.target_pos = np.zeros((num_envs, 2))
+        self.actions = np.zeros((num_envs, 2), dtype=np.float32)
+
+        super().__init__(num_envs, make_observation_space(), make_action_space())
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.np_random, _ = seeding.np_random(self._seeds[0])
+        self._reset_seeds()
+
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self.actions = actions
+
+    def step_wait(self):
+        hit, dist = self._solve_flights(self.actions)
+        rewards = np.where(hit, 100.0, -dist / 100.0).astype(np.float32)
+
+        # Each shot ends its episode: report where it landed, then start over
+        terminal_obs = self._get_obs()
+        dones = np.ones(self.num_envs, dtype=bool)
+        infos = [
+            {"terminal_observation": terminal_obs[i], "TimeLimit.truncated": False}
+            for i in range(self.num_envs)
+        ]
+        self._reset_envs(dones)
+
+        return self._get_obs(), rewards, dones, infos
+
+    def _reset_envs(self, mask):
+        n = int(mask.sum())
+        self.target_pos[mask, 0] = self.np_random.integers(300, self.width - 50, size=n)
+        self.target_pos[mask, 1] = self.np_random.integers(50, self.height - 200, size=n)
+        self.arrow_pos[mask] = self.start_pos
+
+    def _solve_flights(self, actions):
+        # Same action scaling as ArcheryGymEnv.step, applied to the whole batch
+        actions = np.clip(np.asarray(actions, dtype=np.float64), -1.0, 1.0)
+        rad_angle = (actions[:, 0] + 1.0) * ANGLE_SLOPE
+        power_val = (actions[:, 1] + 1.0) * POWER_SLOPE + POWER_OFFSET
+
+        # ArcheryGymEnv keeps its velocity in float32; round the same way
+        vx = (np.cos(rad_angle) * power_val).astype(np.float32).astype(np.float64)
+        vy = (-np.sin(rad_angle) * power_val).astype(np.float32).astype(np.float64)
+
+        # Whole frames only, as in ArcheryGymEnv._solve_flight:
+        # frame n sits at x0 + vx*n, y0 + b*n + a*n^2
+        x0, y0 = self.arrow_pos[:, 0], self.arrow_pos[:, 1]
+        tx, ty = self.target_pos[:, 0], self.target_pos[:, 1]
+        a = 0.5 * self.gravity
+        b = vy - a
+        r2 = (self.target_radius + 10) * (self.target_radius + 10)
+
+        def dist_sq(n):
+            dx = x0[:, None] + vx[:, None] * n - tx[:, None]
+            dy = y0[:, None] + b[:, None] * n + a * n * n - ty[:, None]
+            return dx * dx + dy * dy
+
+        # --- First frame outside the field: the loop's last frame ---
+        with np.errstate(divide="ignore"):
+            n_end = np.where(vx > 0, np.floor((self.width - x0) / vx) + 1, MAX_FLIGHT_STEPS)
+        c = y0 - self.height
+        n_end = np.minimum(n_end, np.floor((-b + np.sqrt(b * b - 4 * a * c)) / (2 * a)) + 1)
+        disc = b * b - 4 * a * (y0 + 100)
+        sq = np.sqrt(np.maximum(disc, 0.0))
+        n_ceiling = np.floor((-b - sq) / (2 * a)) + 1
+        climbing = (b < 0) & (disc > 0) & (n_ceiling < (-b + sq) / (2 * a))
+        n_end = np.where(climbing, np.minimum(n_end, n_ceiling), n_end)
+        n_end = np.minimum(n_end, MAX_FLIGHT_STEPS)
+
+        # --- Closest frames to each target: 1, n_end, and either side of each root ---
+        px, py = x0 - tx, y0 - ty
+        roots = _cubic_real_roots(
+            2 * a * a, 3 * a * b, vx * vx + b * b + 2 * a * py, px * vx + py * b
+        )
+        inside = (roots > 0) & (roots < n_end[:, None])
+        below = np.where(inside, np.maximum(np.floor(roots), 1), n_end[:, None])
+        above = np.where(inside, np.minimum(np.floor(roots) + 1, n_end[:, None]), n_end[:, None])
+        candidates = np.concatenate([np.ones_like(n_end)[:, None], n_end[:, None], below, above], axis=1)
+        candidates.sort(axis=1)
+
+        hits = dist_sq(candidates) < r2
+        hit = hits.any(axis=1)
+        rows = np.arange(self.num_envs)
+        n = np.where(hit, candidates[rows, hits.argmax(axis=1)], n_end)
+
+        # The loop stops at the first frame of the earliest run inside the radius
+        back = hit.copy()
+        while True:
+            back &= (n > 1) & (dist_sq(n[:, None] - 1)[:, 0] < r2)
+            if not back.any():
+                break
+            n = np.where(back, n - 1, n)
+
+        dist = np.sqrt(dist_sq(n[:, None])[:, 0])
+        # x0, y0 are views into arrow_pos, so this goes last
+        self.arrow_pos[:, 0] = x0 + vx * n
+        self.arrow_pos[:, 1] = y0 + b * n + a * n * n
+
+        return hit, dist
+
+    def _get_obs(self):
+        return np.stack([
+            self.arrow_pos[:, 0] / self.width,
+            self.arrow_pos[:, 1] / self.height,
+            self.target_pos[:, 0] / self.width,
+            self.target_pos[:, 1] / self.height
+        ], axis=1).astype(np.float32)
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        # Attributes are shared by the whole batch, so they can't be set per env
+        self._check_whole_batch(indices)
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # One call acts on every env at once (e.g. "reset" resets the whole batch)
+        self._check_whole_batch(indices)
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in range(self.num_envs)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+    def _check_whole_batch(self, indices):
+        if set(self._get_indices(indices)) != set(range(self.num_envs)):
+            raise ValueError("BatchedArcheryEnv only supports set_attr/env_method on all envs at once")
+
+
+class ArcheryDummyVecEnv(DummyVecEnv):
+    """
+    DummyVecEnv that copies each observation once instead of twice.
+
+    The stock step_wait copies obs into buf_obs, then deep-copies buf_obs on
+    the way out. ArcheryGymEnv reuses its obs buffer, so one copy is needed;
+    this writes it straight into a fresh output array. Box observations only.
+    """
+
+    def step_wait(self):
+        obs_out = np.empty_like(self.buf_obs[None])
+        for env_idx in range(self.num_envs):
+            obs, self.buf_rews[env_idx], terminated, truncated, self.buf_infos[env_idx] = self.envs[env_idx].step(
+                self.actions[env_idx]
+            )
+            self.buf_dones[env_idx] = terminated or truncated
+            self.buf_infos[env_idx]["TimeLimit.truncated"] = truncated and not terminated
+
+            if self.buf_dones[env_idx]:
+                # ArcheryGymEnv.reset() fills a different buffer, and buf_infos is deep-copied below
+                self.buf_infos[env_idx]["terminal_observation"] = obs
+                obs, self.reset_infos[env_idx] = self.envs[env_idx].reset()
+            obs_out[env_idx] = obs
+        return obs_out, np.copy(self.buf_rews), np.copy(self.buf_dones), deepcopy(self.buf_infos)
+
+
+def _cubic_real_roots(a, b, c, d):
+    """Real roots of a*t^3 + b*t^2 + c*t + d per row (Cardano), NaN-padded to (N, 3)."""
+    a, b, c, d = np.broadcast_arrays(a, b, c, d)
+    # Depressed cubic u^3 + p*u + q with t = u - b / (3a)
+    shift = b / (3 * a)
+    p = (3 * a * c - b * b) / (3 * a * a)
+    q = (2 * b ** 3 - 9 * a * b * c + 27 * a * a * d) / (27 * a ** 3)
+    disc = (q / 2) ** 2 + (p / 3) ** 3
+
+    roots = np.full(a.shape + (3,), np.nan)
+
+    # One real root
+    one = disc > 0
+    sq = np.sqrt(np.where(one, disc, 0.0))
+    roots[:, 0] = np.where(one, np.cbrt(-q / 2 + sq) + np.cbrt(-q / 2 - sq), np.nan)
+
+    # Three real roots (trigonometric form)
+    three = ~one
+    m = 2 * np.sqrt(np.maximum(-p / 3, 0.0))
+    denom = np.sqrt(np.maximum(-(p / 3) ** 3, 1e-300))
+    theta = np.arccos(np.clip(-q / 2 / denom, -1.0, 1.0)) / 3
+    for k in range(3):
+        root = m * np.cos(theta - 2 * np.pi * k / 3)
+        roots[:, k] = np.where(three, root, roots[:, k])
+
+    return roots - shift[:, None]
@@ -1,13 +1,14 @@
 import gymnasium as gym
 from stable_baselines3 import PPO
 from stable_baselines3.common.env_checker import check_env
-from stable_baselines3.common.env_util import make_vec_env # Needed for multicore
+from stable_baselines3.common.vec_env import VecMonitor
 import os
 import datetime
 import webbrowser
 from tensorboard import program
 from archery_env import ArcheryGymEnv
-import multiprocessing
+from batched_archery_env import ArcheryDummyVecEnv, BatchedArcheryEnv
+import torch
 
 # 1. Setup Directories
 models_dir = "models"
@@ -16,15 +17,13 @@ os.makedirs(models_dir, exist_ok=True)
 os.makedirs(logs_dir, exist_ok=True)
 
 if __name__ == '__main__':
-    # 2. ASK USER FOR CORES
-    # Multiprocessing requires this block to prevent infinite loops on Windows
-    max_cores = multiprocessing.cpu_count()
-    print(f"Your system has {max_cores} CPU cores.")
-    
+    # 2. ASK USER FOR ENVIRONMENTS
+    # All environments are simulated together in this one process (BatchedArcheryEnv),
+    # so the count isn't tied to the number of CPU cores
     while True:
         try:
-            n_envs = int(input(f"How many environments (cores) to run in parallel? (1-{max_cores}): "))
-            if 1 <= n_envs <= max_cores:
+            n_envs = int(input("How many environments to simulate in parallel? (1 or more): "))
+            if n_envs >= 1:
                 break
             print("Invalid number.")
         except ValueError:
@@ -38,15 +37,28 @@ if __name__ == '__main__':
         print("Checking environment compatibility...")
         check_env(env)
         print("Environment is valid!")
+        env = VecMonitor(ArcheryDummyVecEnv([lambda e=env: e]))
     else:
-        # Vectorized Env (Multicore)
-        # This creates 'n_envs' copies of ArcheryGymEnv running at once
+        # Vectorized Env (Batched)
+        # This simulates 'n_envs' copies of ArcheryGymEnv at once with NumPy, in this process
         print(f"Creating {n_envs} parallel environments...")
-        env = make_vec_env(lambda: ArcheryGymEnv(render_mode=None), n_envs=n_envs)
+        env = VecMonitor(BatchedArcheryEnv(n_envs))
 
     # 4. Create Model
+    # Small net on CPU: 4 obs -> 2 actions doesn't need the default [64, 64] or a GPU
+    # One torch thread: the net is tiny, and a BLAS thread pool only contends for the cores
+    torch.set_num_threads(1)
+    N_STEPS = 256 # Per env, per rollout (default 2048)
     print("Initializing PPO Model...")
-    model = PPO("MlpPolicy", env, verbose=1, tensorboard_log=logs_dir)
+    model = PPO(
+        "MlpPolicy", env,
+        n_steps=N_STEPS,
+        batch_size=n_envs * N_STEPS // 4, # 4 minibatches per epoch
+        policy_kwargs=dict(net_arch=[32, 32]),
+        device="cpu",
+        verbose=1,
+        tensorboard_log=logs_dir
+    )
 
     # --- AUTO-LAUNCH TENSORBOARD ---
     try:
@@ -61,7 +73,7 @@ if __name__ == '__main__':
 
     # 5. Train
     TIMESTEPS = 0 # 1500000
-    print(f"Training started for {TIMESTEPS} steps on {n_envs} cores...")
+    print(f"Training started for {TIMESTEPS} steps on {n_envs} environments...")
     model.learn(total_timesteps=TIMESTEPS)
     print("Training finished!")
 